@@ -7,21 +7,50 @@ This module provides nostr basic functionalities.
 import os
 import re
 import json
-import pyaes
 import base64
+import asyncio
 import hashlib
 import binascii
+import msgpack
 import websockets
 import cSecp256k1
 
-from collections import namedtuple
+from collections import namedtuple, OrderedDict
+from functools import lru_cache, cached_property
+from operator import itemgetter
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 from pynostr import bech32
 from typing import Union
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 
 HEX64 = re.compile("^[0-9a-f]{64}$")
+#: initial counter block of AES-CTR mode, it matches the `pyaes` default
+#: counter so that previously stored private keys can still be decrypted.
+CTR_NONCE = (1).to_bytes(16, "big")
+#: maximum number of shared secrets kept in memory by
+#: [`PrvKey.shared_secret`](#pynostr.PrvKey.shared_secret).
+SHARED_SECRET_CACHE_SIZE = 1024
+_SHARED_SECRETS = OrderedDict()
+#: maximum number of contact files kept in memory by
+#: [load_contact](#pynostr.load_contact).
+CONTACT_CACHE_SIZE = 64
+_CONTACTS = OrderedDict()
+#: opened relay connections reused by [send_event](#pynostr.send_event). Each
+#: `(loop, uri)` pair is bound to a `[websocket, lock]` list.
+_RELAY_POOL = {}
+_POOL_CLOSERS = set()
+#: seconds to wait for relay `OK` responses before giving up.
+RELAY_TIMEOUT = 10
 
 __path__.append(os.path.join(os.path.dirname(__file__), "nip"))
+_CONTACT_DIR = os.path.join(os.path.dirname(__path__[0]), ".contact")
+_PRVKEY_DIR = os.path.join(os.path.dirname(__file__), ".prvkey")
+_DIRS_READY = False
 
 #: Contact is defined by a public key, a relay and a petname. It is implemented
 #: as a `namedtuple` with `pubkey`, `relay` and `petname` fieldnames.
@@ -41,7 +70,8 @@ Contact = namedtuple('Contact', 'pubkey relay petname')
 
 def dump_contact(name: str, *contacts) -> None:
     """
-Store a list of [contact](#pynostr.Contact) as json format. Files are stored in
+Append a list of [contact](#pynostr.Contact) to a msgpack log file, a contact
+overrides previous ones with the same public key. Files are stored in
 `<pynostr.__path__[0]>/.contact` folder. Folder `.contact` is created if
 needed.
 
@@ -50,20 +80,28 @@ Arguments:
     *contacts: variable length of [contact](#pynostr.Contact)
 """
     # get the file path and create folders if needed
-    filename = os.path.join(os.path.dirname(__path__[0]), ".contact", name)
-    os.makedirs(os.path.dirname(filename), exist_ok=True)
-    # if file already created, load it to avoid loosing them
+    filename = os.path.join(_CONTACT_DIR, name)
+    _ensure_dirs()
+    # contacts are merged by public key, last one wins
+    merged = dict((c[0], c) for c in contacts)
+    mode = "ab"
     if os.path.exists(filename):
-        contacts += tuple(
-            [
-                ctc for ctc in load_contact(name)
-                if ctc[0] not in [c[0] for c in contacts]
-            ]
-        )
-
-    with open(filename, "w") as out:
+        count, known = _read_contact(filename)
+        # rewrite former json files and logs mostly made of overridden
+        # contacts
+        if count is None or count > 2 * len(known) + 16:
+            mode = "wb"
+            merged = {**dict((c[0], c) for c in known), **merged}
+            _CONTACTS.pop(filename, None)
+
+    # store hexadecimal public keys as raw bytes
+    packer = msgpack.Packer()
+    with open(filename, mode) as out:
         out.write(
-            json.dumps(list(sorted(contacts, key=lambda c: c[-1])), indent=2)
+            b"".join(
+                packer.pack((_hex_to_bytes(c[0]), c[1], c[2]))
+                for c in merged.values()
+            )
         )
 
 
@@ -78,23 +116,27 @@ Arguments:
 Returns:
     list: list of [contact](#pynostr.Contact).
 """
-    filename = os.path.join(os.path.dirname(__path__[0]), ".contact", name)
+    filename = os.path.join(_CONTACT_DIR, name)
     if os.path.exists(filename):
-        with open(filename, "r") as _in:
-            contacts = [Contact(*ctc) for ctc in json.loads(_in.read())]
-        return contacts
+        return list(_read_contact(filename)[1])
     return []
 
 
 async def send_event(event: dict, uri: str) -> list:
     """
-Push single event to a single relay and return responses.
+Push single event to a single relay and return its `OK` response, other relay
+messages (`AUTH`, `NOTICE`...) are skipped. Connection to the relay is kept
+open and reused by subsequent calls within the same event loop, it is closed
+when the loop is shut down by `asyncio.run` or on
+[close_relays](#pynostr.close_relays) call. If the connection has been closed
+meanwhile, it is reopened once.
 
 Args:
     event (dict): the event given as a python dict.
     uri (str): relay uri.
 Returns:
-    list: relay response as python list.
+    list: relay response as python list or `None` if relay did not answer
+        within [`RELAY_TIMEOUT`](#pynostr.RELAY_TIMEOUT) seconds.
 Examples:
     Here is a snippet of python code to send a text note to a specific nostr
     relay:
@@ -109,14 +151,112 @@ Examples:
     ['OK', '2781d[...]d28c9', True, '']
     ```
 """
-    async with websockets.connect(uri) as ws:
-        req = json.dumps(["EVENT", event], separators=(",", ":"))
-        await ws.send(req)
-        resp = await ws.recv()
-        result = json.loads(resp)
-    return result
+    return (await _exchange(uri, [event]))[0]
+
 
+async def send_events(events: list, uri: str) -> list:
+    """
+Push multiple events to a single relay and return responses. All events are
+sent on the same connection before relay responses are read, see
+[send_event](#pynostr.send_event). If the connection is lost, events not
+acknowledged yet are sent again: some of them may already have been accepted by
+the relay.
 
+Args:
+    events (list): events given as python dict.
+    uri (str): relay uri.
+Returns:
+    list: relay `OK` responses as python list, in events order. `None` is set
+        for events the relay did not answer within
+        [`RELAY_TIMEOUT`](#pynostr.RELAY_TIMEOUT) seconds.
+"""
+    return await _exchange(uri, events)
+
+
+def _event_frame(event: dict) -> Union[str, bytes]:
+    if orjson is None:
+        return json.dumps(["EVENT", event], separators=(",", ":"))
+    # orjson output is already compact, only the envelope has to be added
+    return b'["EVENT",' + orjson.dumps(event) + b"]"
+
+
+async def _exchange(uri: str, events: list) -> list:
+    reqs = [_event_frame(e) for e in events]
+    responses = [None] * len(events)
+    # indexes of events still waiting for an OK response, by event id
+    waiting = {}
+    for i, event in enumerate(events):
+        waiting.setdefault(event.get("id", None), []).append(i)
+    loop = asyncio.get_running_loop()
+    for attempt in range(2):
+        # websocket connections are bound to the loop that opened them
+        relay = _RELAY_POOL.get((loop, uri), None)
+        if relay is None:
+            if not any(key[0] is loop for key in _RELAY_POOL):
+                # loop only keeps weak references to its tasks
+                closer = loop.create_task(_close_on_shutdown())
+                _POOL_CLOSERS.add(closer)
+                closer.add_done_callback(_POOL_CLOSERS.discard)
+            relay = _RELAY_POOL[(loop, uri)] = [None, asyncio.Lock()]
+        # lock ensures responses are read by the coroutine that sent events
+        async with relay[1]:
+            try:
+                if relay[0] is None:
+                    relay[0] = await websockets.connect(uri)
+                for indexes in waiting.values():
+                    for i in indexes:
+                        # utf-8 bytes are sent as text frames
+                        await relay[0].send(reqs[i], text=True)
+                await asyncio.wait_for(
+                    _read_ok(relay[0], waiting, responses), RELAY_TIMEOUT
+                )
+                return responses
+            except asyncio.TimeoutError:
+                return responses
+            except websockets.ConnectionClosed:
+                relay[0] = None
+                if attempt:
+                    raise
+        await asyncio.sleep(0.5 * 2 ** attempt)
+
+
+async def _read_ok(websocket, waiting: dict, responses: list) -> None:
+    # store OK responses at their event index until all events are answered,
+    # any other relay message is skipped. Cancelling recv loses no message
+    loads = json.loads if orjson is None else orjson.loads
+    while waiting:
+        msg = loads(await websocket.recv(decode=False))
+        if isinstance(msg, list) and len(msg) > 1 and msg[0] == "OK" and \
+           msg[1] in waiting:
+            indexes = waiting[msg[1]]
+            responses[indexes.pop(0)] = msg
+            if not indexes:
+                waiting.pop(msg[1])
+
+
+async def _close_on_shutdown() -> None:
+    # one task per loop using relay pool: asyncio.run cancels it on exit and
+    # the loop connections are then closed
+    try:
+        await asyncio.get_running_loop().create_future()
+    finally:
+        await close_relays()
+
+
+async def close_relays() -> None:
+    """
+Close relay connections opened by [send_event](#pynostr.send_event) within
+the running event loop.
+"""
+    loop = asyncio.get_running_loop()
+    for key, relay in list(_RELAY_POOL.items()):
+        if key[0] is loop or key[0].is_closed():
+            _RELAY_POOL.pop(key)
+            if key[0] is loop and relay[0] is not None:
+                await relay[0].close()
+
+
+@lru_cache(maxsize=4096)
 def to_bech32(prefix: str, hexa: str) -> str:
     """
 Encode string to `bech32`.
@@ -127,10 +267,10 @@ Args:
 Returns:
     str: `bech32` encoded string.
 """
-    converted_bits = bech32.convertbits(bytes.fromhex(hexa), 8, 5)
-    return bech32.bech32_encode(prefix, converted_bits, bech32.Encoding.BECH32)
+    return _to_bech32_bytes(prefix, bytes.fromhex(hexa))
 
 
+@lru_cache(maxsize=4096)
 def from_bech32(b32: str) -> str:
     """
 Decode a `bech32` encoded string.
@@ -142,11 +282,27 @@ Returns:
 Raises:
     Bech32DecodeError: if error occurs within bech32 module.
 """
-    data, success = bech32.bech32_decode(b32)[1:]
-    if success:
-        return bytearray(bech32.convertbits(data, 5, 8))[:-1].hex()
+    return _from_bech32_bytes(b32).hex()
+
+
+def _to_bech32_bytes(prefix: str, raw: bytes) -> str:
+    if len(raw) == 32:
+        converted_bits = bech32.convert32bytes_to_5bits(raw)
     else:
-        raise Bech32DecodeError()
+        converted_bits = bech32.convertbits(raw, 8, 5)
+    return bech32.bech32_encode(prefix, converted_bits, bech32.Encoding.BECH32)
+
+
+def _from_bech32_bytes(b32: str) -> bytes:
+    data, success = bech32.bech32_decode(b32)[1:]
+    if success and len(data) == 52:
+        return bech32.convert52groups_to_8bits(data)
+    elif success:
+        # padding bits are dropped, None is returned if they are not zeros
+        decoded = bech32.convertbits(data, 5, 8, False)
+        if decoded is not None:
+            return bytes(decoded)
+    raise Bech32DecodeError()
 
 
 def bech32_puk(pubkey: str) -> str:
@@ -209,10 +365,10 @@ class PrvKey(cSecp256k1.Schnorr):
 a subclass of python `int` with cryptographic attributes and methods.
 
 Attributes:
-    encpuk (property): secp256k1 encoded public key.
-    pubkey (property): nostr encoded public key.
-    npub (property): bech32 encoded nostr public key.
-    nsec (property): bech32 encoded nostr private key.
+    encpuk (cached property): secp256k1 encoded public key.
+    pubkey (cached property): nostr encoded public key.
+    npub (cached property): bech32 encoded nostr public key.
+    nsec (cached property): bech32 encoded nostr private key.
 Examples:
     Bellow basic uses of [PrvKey](#pynostr.PrvKey):
 
@@ -262,30 +418,31 @@ Examples:
 
 """
 
-    @property
+    @cached_property
     def encpuk(self) -> str:
         "`secp256k1` encoded public key."
         return cSecp256k1.Schnorr.puk(self).encode().decode("utf-8")
 
-    @property
+    @cached_property
     def pubkey(self) -> str:
         "`schnorr` encoded public key."
-        return cSecp256k1.Schnorr.puk(self).x.decode("utf-8")
+        # cSecp256k1 drops leading zeros of x abscissa
+        return cSecp256k1.Schnorr.puk(self).x.decode("utf-8").zfill(64)
 
-    @property
+    @cached_property
     def npub(self) -> str:
         "`nostr` encoded public key."
         return bech32_puk(self.pubkey)
 
-    @property
+    @cached_property
     def nsec(self) -> str:
         "`nostr` encoded private key."
-        return bech32_prk("%064x" % self)
+        return _to_bech32_bytes("nsec", self.to_bytes(32, "big"))
 
     @staticmethod
     def from_bech32(b32prk: str) -> object:
         "Create à [PrvKey](#pynostr.PrvKey) from `nostr` encoded private key"
-        return PrvKey(int(from_bech32(b32prk), base=16))
+        return PrvKey(int.from_bytes(_from_bech32_bytes(b32prk), "big"))
 
     @staticmethod
     def load(pin: str) -> object:
@@ -295,15 +452,11 @@ Load a [PrvKey](#pynostr.PrvKey) from file.
 Arguments:
     pin (str): pin code used to decrypt private key and to determine filename.
 """
-        pin = pin.encode("utf-8")
-        fn = os.path.join(
-            os.path.dirname(__file__), ".prvkey",
-            "%s.key" % hashlib.sha256(pin).hexdigest()
-        )
+        h = hashlib.sha256(pin.encode("utf-8")).digest()
+        fn = os.path.join(_PRVKEY_DIR, "%s.key" % h.hex())
         if os.path.isfile(fn):
             with open(fn, "rb") as input:
-                aes = pyaes.AESModeOfOperationCTR(hashlib.sha256(pin).digest())
-                data = aes.decrypt(base64.b64decode(input.read()))
+                data = _aes_ctr(base64.b64decode(input.read()), h)
                 return PrvKey(int(data.decode("utf-8"), 16))
 
     def dump(self, pin: str) -> None:
@@ -315,17 +468,37 @@ Arguments:
 Returns:
     pynostr.PrvKey: private key
 """
-        pin = pin.encode("utf-8")
-        fn = os.path.join(
-            os.path.dirname(__file__), ".prvkey",
-            "%s.key" % hashlib.sha256(pin).hexdigest()
-        )
-        os.makedirs(os.path.dirname(fn), exist_ok=True)
-        aes = pyaes.AESModeOfOperationCTR(hashlib.sha256(pin).digest())
-        data = base64.b64encode(aes.encrypt(("%064x" % self).encode("utf-8")))
+        h = hashlib.sha256(pin.encode("utf-8")).digest()
+        fn = os.path.join(_PRVKEY_DIR, "%s.key" % h.hex())
+        _ensure_dirs()
+        data = base64.b64encode(_aes_ctr(("%064x" % self).encode("utf-8"), h))
         with open(fn, "wb") as output:
             output.write(data)
 
+    @staticmethod
+    def verify_batch(triples) -> bool:
+        """
+Verify a sequence of schnorr signatures, stopping at first invalid one.
+
+Arguments:
+    triples (iterable): `(msg, sig, pubkey)` tuples where `msg` is the signed
+        data, `sig` the raw signature as hexadecimal string and `pubkey` the
+        signer public key as hexadecimal or `npub` string.
+Returns:
+    bool: `True` if all signatures are genuine, `False` other else.
+"""
+        # cSecp256k1 does not provide multi-scalar multiplication, so a
+        # random linear combination check would cost more than it saves:
+        # signatures are checked one by one with local shortcuts
+        verify = cSecp256k1._schnorr.verify
+        hash_sha256 = cSecp256k1.hash_sha256
+        return all(
+            verify(
+                hash_sha256(msg), _pubkey(pubkey).encode("utf-8"),
+                sig[:64].encode("utf-8"), sig[64:].encode("utf-8")
+            ) for msg, sig, pubkey in triples
+        )
+
     def shared_secret(self, pubkey: str) -> str:
         """
 Compute a shared secret with a specifc public key. This comes from public key
@@ -340,11 +513,28 @@ Returns:
     str: shared secret. It is the x abcsissa of curve point issued by
         [`PrvKey`](#pynostr.PrvKey)` x csecp256k1.PublicKey`
 """
+        return self._shared_secret(pubkey).hex()
+
+    def _shared_secret(self, pubkey: str) -> bytes:
+        # raw bytes version of shared_secret used by encryption internals
         if pubkey.startswith("npub"):
             pubkey = "02" + from_bech32(pubkey)
         elif len(pubkey) == 64:
             pubkey = "02" + pubkey
-        return (cSecp256k1.PublicKey.decode(pubkey) * self).x.decode("utf-8")
+        # scalar multiplication is costly, reuse previous computations. Cache
+        # is keyed on public keys so that no private scalar is kept in memory,
+        # keys k and -k share the same x-only public key and the same secret
+        key = (self.pubkey, pubkey)
+        secret = _SHARED_SECRETS.get(key, None)
+        if secret is None:
+            # x abscissa is given without its leading zeros
+            secret = (cSecp256k1.PublicKey.decode(pubkey) * self).x
+            secret = _SHARED_SECRETS[key] = int(secret, 16).to_bytes(32, "big")
+            if len(_SHARED_SECRETS) > SHARED_SECRET_CACHE_SIZE:
+                _SHARED_SECRETS.popitem(last=False)
+        else:
+            _SHARED_SECRETS.move_to_end(key)
+        return secret
 
     def encrypt(self, msg: Union[str, bytes], pubkey: str) -> str:
         """
@@ -364,12 +554,14 @@ Returns:
 """
         initialization_vector = os.urandom(16)
         cipher = _encrypt(
-            msg, binascii.unhexlify(self.shared_secret(pubkey)),
-            initialization_vector
+            msg, self._shared_secret(pubkey), initialization_vector
         )
-        cipher = base64.b64encode(cipher)
-        initialization_vector = base64.b64encode(initialization_vector)
-        return (cipher + b"?iv=" + initialization_vector).decode("utf-8")
+        return b"".join(
+            (
+                base64.b64encode(cipher), b"?iv=",
+                base64.b64encode(initialization_vector)
+            )
+        ).decode("ascii")
 
     def decrypt(self, msg: str, pubkey: str) -> str:
         """
@@ -401,22 +593,108 @@ Raises:
                 "message is not nip04 compliant, "
                 "can not apply base 64 decoder"
             )
-        decrypted = _decrytp(
-            cipher, binascii.unhexlify(self.shared_secret(pubkey)), iv=iv
-        )
+        decrypted = _decrytp(cipher, self._shared_secret(pubkey), iv=iv)
         return decrypted.decode("utf-8")
 
 
+def _read_contact(filename: str) -> tuple:
+    # return stored record number (None for json format) and contacts sorted
+    # by petname, files are parsed again only if modified and only records
+    # appended since last read are parsed if file grew
+    stat = os.stat(filename)
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = _CONTACTS.get(filename, None)
+    if cached is not None and cached[0] == key:
+        _CONTACTS.move_to_end(filename)
+        return cached[1], cached[3]
+
+    offset, count, merged = 0, 0, {}
+    if cached is not None and cached[1] is not None and \
+       cached[0][1] < stat.st_size:
+        offset, count, merged = cached[0][1], cached[1], cached[2]
+    with open(filename, "rb") as _in:
+        _in.seek(offset)
+        data = _in.read()
+    if offset == 0 and data[:1] == b"[":
+        # contact file stored with former json format
+        count, records = None, (json if orjson is None else orjson).loads(data)
+    else:
+        records = []
+        unpacker = msgpack.Unpacker()
+        unpacker.feed(data)
+        for obj in unpacker:
+            # contact file stored as a single list of contacts
+            if not obj or isinstance(obj[0], list):
+                records.extend(obj)
+            else:
+                records.append(obj)
+        count += len(records)
+
+    # last record of a public key wins
+    for p, r, n in records:
+        merged[p.hex() if isinstance(p, bytes) else p] = (r, n)
+    contacts = tuple(
+        sorted(
+            (Contact(p, r, n) for p, (r, n) in merged.items()),
+            key=itemgetter(2)
+        )
+    )
+
+    _CONTACTS[filename] = (key, count, merged, contacts)
+    if len(_CONTACTS) > CONTACT_CACHE_SIZE:
+        _CONTACTS.popitem(last=False)
+    return count, contacts
+
+
+def _hex_to_bytes(value: str) -> Union[str, bytes]:
+    # return raw bytes of an hexadecimal public key, other values untouched
+    return bytes.fromhex(value) if _is_hex64(value) else value
+
+
+def _ensure_dirs() -> None:
+    # create storage folders only once per session
+    global _DIRS_READY
+    if not _DIRS_READY:
+        os.makedirs(_CONTACT_DIR, exist_ok=True)
+        os.makedirs(_PRVKEY_DIR, exist_ok=True)
+        _DIRS_READY = True
+
+
+def _aes_ctr(data: bytes, secret: bytes) -> bytes:
+    # CTR mode is symetric: same call is used to encrypt and decrypt
+    aes = Cipher(algorithms.AES(secret), modes.CTR(CTR_NONCE)).encryptor()
+    return aes.update(data) + aes.finalize()
+
+
 def _encrypt(msg: Union[str, bytes], secret: bytes, iv: bytes) -> bytes:
-    encrypter = pyaes.Encrypter(pyaes.AESModeOfOperationCBC(secret, iv=iv))
+    encryptor = Cipher(algorithms.AES(secret), modes.CBC(iv)).encryptor()
     msg = msg.encode("utf-8") if isinstance(msg, str) else msg
-    return encrypter.feed(msg) + encrypter.feed()
+    # PKCS7 padding
+    pad = 16 - (len(msg) & 15)
+    return encryptor.update(msg + bytes((pad,)) * pad) + encryptor.finalize()
 
 
 def _decrytp(cipher: Union[str, bytes], secret: bytes, iv: bytes) -> bytes:
-    decrypter = pyaes.Decrypter(pyaes.AESModeOfOperationCBC(secret, iv=iv))
+    decryptor = Cipher(algorithms.AES(secret), modes.CBC(iv)).decryptor()
     cipher = cipher.encode("utf-8") if isinstance(cipher, str) else cipher
-    return decrypter.feed(cipher) + decrypter.feed()
+    data = decryptor.update(cipher) + decryptor.finalize()
+    # remove PKCS7 padding
+    pad = data[-1] if data else 0
+    if not 0 < pad <= 16 or data[-pad:] != bytes((pad,)) * pad:
+        raise ValueError("invalid padding byte")
+    return data[:-pad]
+
+
+def _is_hex64(value: str) -> bool:
+    # same as HEX64.fullmatch without running the regex engine: bytes.fromhex
+    # also accepts upper case and whitespaces so they are excluded first
+    if len(value) != 64 or not value.isalnum() or value != value.lower():
+        return False
+    try:
+        bytes.fromhex(value)
+    except ValueError:
+        return False
+    return True
 
 
 def _prvkey(prvkey: Union[str, PrvKey]):
@@ -425,17 +703,17 @@ def _prvkey(prvkey: Union[str, PrvKey]):
     else:
         if prvkey.startswith("nsec"):
             prvkey = int(from_bech32(prvkey), base=16)
-        elif prvkey and HEX64.match(prvkey):
+        elif prvkey and _is_hex64(prvkey):
             prvkey = int(prvkey, base=16)
         return PrvKey(prvkey)
 
 
 def _pubkey(pubkey: Union[str, cSecp256k1.PublicKey]):
     if isinstance(pubkey, cSecp256k1.PublicKey):
-        pubkey = pubkey.x.decode("utf-8")
+        pubkey = pubkey.x.decode("utf-8").zfill(64)
     else:
         if pubkey.startswith("npub"):
             pubkey = from_bech32(pubkey)
-        elif not HEX64.match(pubkey):
+        elif not _is_hex64(pubkey):
             pubkey = pubkey[2:]
         return pubkey
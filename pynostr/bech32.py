@@ -22,6 +22,8 @@
 
 
 from enum import Enum
+from functools import reduce
+from operator import xor
 
 
 class Encoding(Enum):
@@ -32,17 +34,19 @@ class Encoding(Enum):
 
 CHARSET = "qpzry9x8gf2tvdw0s3jn54khce6mua7l"
 BECH32M_CONST = 0x2bc830a3
+GENERATOR = [0x3b6a57b2, 0x26508e6d, 0x1ea119fa, 0x3d4233dd, 0x2a1462b3]
+# xor of generator values selected by each possible 5-bit checksum top
+GENERATOR_TABLE = [
+    reduce(xor, (GENERATOR[i] for i in range(5) if (top >> i) & 1), 0)
+    for top in range(32)
+]
 
 
-def bech32_polymod(values):
+def bech32_polymod(values, chk=1):
     """Internal function that computes the Bech32 checksum."""
-    generator = [0x3b6a57b2, 0x26508e6d, 0x1ea119fa, 0x3d4233dd, 0x2a1462b3]
-    chk = 1
+    table = GENERATOR_TABLE
     for value in values:
-        top = chk >> 25
-        chk = (chk & 0x1ffffff) << 5 ^ value
-        for i in range(5):
-            chk ^= generator[i] if ((top >> i) & 1) else 0
+        chk = (chk & 0x1ffffff) << 5 ^ value ^ table[chk >> 25]
     return chk
 
 
@@ -51,9 +55,24 @@ def bech32_hrp_expand(hrp):
     return [ord(x) >> 5 for x in hrp] + [0] + [ord(x) & 31 for x in hrp]
 
 
+# checksum state after the expanded HRP of nostr prefixes
+HRP_POLYMOD = dict(
+    (hrp, bech32_polymod(bech32_hrp_expand(hrp)))
+    for hrp in ("npub", "nsec", "note")
+)
+
+
+def bech32_hrp_polymod(hrp):
+    """Checksum state after the expanded HRP, precomputed for nostr ones."""
+    chk = HRP_POLYMOD.get(hrp, None)
+    if chk is None:
+        chk = bech32_polymod(bech32_hrp_expand(hrp))
+    return chk
+
+
 def bech32_verify_checksum(hrp, data):
     """Verify a checksum given HRP and converted data characters."""
-    const = bech32_polymod(bech32_hrp_expand(hrp) + data)
+    const = bech32_polymod(data, bech32_hrp_polymod(hrp))
     if const == 1:
         return Encoding.BECH32
     if const == BECH32M_CONST:
@@ -63,9 +82,10 @@ def bech32_verify_checksum(hrp, data):
 
 def bech32_create_checksum(hrp, data, spec):
     """Compute the checksum values given HRP and data."""
-    values = bech32_hrp_expand(hrp) + data
     const = BECH32M_CONST if spec == Encoding.BECH32M else 1
-    polymod = bech32_polymod(values + [0, 0, 0, 0, 0, 0]) ^ const
+    polymod = bech32_polymod(
+        data + [0, 0, 0, 0, 0, 0], bech32_hrp_polymod(hrp)
+    ) ^ const
     return [(polymod >> 5 * (5 - i)) & 31 for i in range(6)]
 
 
@@ -96,6 +116,12 @@ def bech32_decode(bech):
 
 def convertbits(data, frombits, tobits, pad=True):
     """General power-of-2 base conversion."""
+    if frombits == 8 and tobits == 5 and pad and \
+       isinstance(data, (bytes, bytearray)):
+        # shift the whole byte string at once as a single integer
+        size = (len(data) * 8 + 4) // 5
+        acc = int.from_bytes(data, "big") << (size * 5 - len(data) * 8)
+        return [(acc >> shift) & 31 for shift in range(size * 5 - 5, -1, -5)]
     acc = 0
     bits = 0
     ret = []
@@ -117,6 +143,24 @@ def convertbits(data, frombits, tobits, pad=True):
     return ret
 
 
+# bit shifts extracting the 52 groups of 5 bits from a 4-bit padded 256 bit
+# integer, and 5-bit binary strings to rebuild it
+SHIFTS_52 = tuple(range(255, -1, -5))
+BIN5 = tuple(format(value, "05b") for value in range(32))
+
+
+def convert32bytes_to_5bits(data):
+    """Padded 8 to 5 bits conversion of exactly 32 bytes (ie nostr keys)."""
+    acc = int.from_bytes(data, "big") << 4
+    return [(acc >> shift) & 31 for shift in SHIFTS_52]
+
+
+def convert52groups_to_8bits(data):
+    """Reverse of convert32bytes_to_5bits, padding bits are dropped."""
+    acc = int("".join(map(BIN5.__getitem__, data)), 2)
+    return (acc >> 4).to_bytes(32, "big")
+
+
 def decode(hrp, addr):
     """Decode a segwit address."""
     hrpgot, data, spec = bech32_decode(addr)
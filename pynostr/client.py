@@ -8,17 +8,30 @@ relay.
 import os
 import sys
 import json
+import time
 import queue
 import asyncio
 import textwrap
 import threading
 import websockets
+import pynostr
 
 from pynostr import filter, event
-from datetime import datetime
 from collections import deque
+from concurrent import futures
 from enum import StrEnum
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is None:
+    _dumps, _loads = json.dumps, json.loads
+else:
+    # utf-8 bytes are sent as text frames, relays expect text frames
+    _dumps, _loads = orjson.dumps, orjson.loads
+
 
 class Style(StrEnum):
     END = '\33[0m'  # stop line color style (return to default)
@@ -27,6 +40,7 @@ class Style(StrEnum):
     GRN = '\33[32m'  # set line color to green
 
 
+# deprecated, not raised anymore as subscriptions share the same websocket
 class AlreadySubcribed(Exception):
     """Exception used if a subscription is already running"""
 
@@ -69,31 +83,51 @@ if sys.platform == "win32":
     win_enable_vt100()
 
 
+#: event loop running websockets of all clients in a single daemon thread,
+#: started on first client creation.
+_LOOP = None
+_LOOP_LOCK = threading.Lock()
+
+
+def _shared_loop() -> asyncio.AbstractEventLoop:
+    global _LOOP
+    with _LOOP_LOCK:
+        if _LOOP is None:
+            _LOOP = asyncio.new_event_loop()
+            threading.Thread(target=_LOOP.run_forever, daemon=True).start()
+    return _LOOP
+
+
 #: copied from from websockets.__main__.py
-def print_during_input(string: str) -> None:
-    sys.stdout.write(
-        # Save cursor position
-        "\N{ESC}7"
-        # Add a new line
-        "\N{LINE FEED}"
-        # Move cursor up
-        "\N{ESC}[A"
-        # Insert blank line, scroll last line down
-        "\N{ESC}[L"
-        # Print string in the inserted blank line
-        f"{string}\N{LINE FEED}"
-        # Restore cursor position
-        "\N{ESC}8"
-        # Move cursor down
-        "\N{ESC}[B"
-    )
+_DURING_INPUT = (
+    # Save cursor position
+    "\N{ESC}7"
+    # Add a new line
+    "\N{LINE FEED}"
+    # Move cursor up
+    "\N{ESC}[A"
+    # Insert blank line, scroll last line down
+    "\N{ESC}[L"
+    # Print string in the inserted blank line
+    "%s\N{LINE FEED}"
+    # Restore cursor position
+    "\N{ESC}8"
+    # Move cursor down
+    "\N{ESC}[B"
+)
+
+
+def print_during_input(*strings: str) -> None:
+    # all lines are written and flushed at once
+    sys.stdout.write("".join([_DURING_INPUT % string for string in strings]))
     sys.stdout.flush()
 
 
 class BaseThread:
     """
-A Simple text client. It allows custom subscription to a specific relay.
-Sending and receiving is possible until subscription is over.
+A Simple text client. It allows custom subscriptions to a specific relay, all
+of them sharing the same websocket. Sending and receiving is possible until
+subscriptions are over.
 
 Args:
     uri (str): the nostr relay url.
@@ -103,10 +137,9 @@ Attributes:
     uri (str): the nostr relay url.
     timeout (str): wait timeout in seconds [default = 5].
     textwidth (int): text width for the output [default = 100].
-    response (queue.Queue): queue to store relay response.
-    request (queue.Queue): queue to store client requests.
-    loop (asyncio.BaseEventLoop): event loop used to un sending/listening
-        process.
+    request (queue.SimpleQueue): queue to store client requests.
+    loop (asyncio.BaseEventLoop): event loop used to run sending/listening
+        process, it is shared by all clients.
 Examples:
     ```python
     >>> from pynostr import client
@@ -119,63 +152,110 @@ Examples:
     ) -> None:
         self.uri = uri
         self.timeout = timeout
-        self.response = queue.Queue()
-        self.request = queue.Queue()
-        self.loop = asyncio.new_event_loop()
+        self.request = queue.SimpleQueue()
+        self.loop = _shared_loop()
         self.textwidth = textwidth
-        self.__filter: filter.Filter
-        self.__trace: deque
-        self.__id = None
+        self.__wrapper = textwrap.TextWrapper(break_on_hyphens=True)
+        # subscription id is bound to a `(request, trace, traced)` tuple
+        self.__subs = {}
+        self.__lock = threading.Lock()
+        self.__closing = False
+        self.__stopping = False
+        self.__connected = False
+        # requests sent and waiting for relay answer, `("EVENT", event_id)`
+        # answered by OK and `("REQ", sub_id)` answered by EOSE or CLOSED
+        self.__pending = set()
+        self.__wake = asyncio.Event()
+        # single signing worker, created on demand, so that events are sent
+        # in the order they were pushed
+        self.__signer = None
+        self.__signing = set()
         self.__stop = threading.Event()
 
     def subscribe(self, cnf: dict = {}, **kw) -> None:
         """
 Subscribe to relay with custom filtering. See [filter](filter#Filter) class
-for basic uses.
+for basic uses. Subscriptions made while others are running are sent through
+the same websocket.
 
 Arguments:
     cnf (dict): key-value pairs.
     **kw: arbitrary keyword arguments.
+Returns:
+    str: subscription id.
 Examples:
     ```python
     >>> # subscribe to all messages kind 1, 2 or 3 getting the last 5 ones.
     >>> c.subscribe(kinds=[0, 1, 3], limit=5)
+    'c8b1a[...]0d4e2'
     ```
 """
-        # check if already runing a subscription
-        if hasattr(self, "resp_daemon"):
-            if self.resp_daemon.is_alive():
-                raise AlreadySubcribed(
-                    "subscription %s is already running" % self.__id
-                )
+        fltr = filter.Filter(cnf, **kw)
+        sub_id = os.urandom(16).hex()
+        req = ["REQ", sub_id, fltr.apply()]
+        # subscription request is sent again on each reconnection
+        sub = (_dumps(req), deque(maxlen=fltr.limit), set())
+        while True:
+            # listening task is checked and started under lock so that
+            # concurrent subscriptions share a single task
+            with self.__lock:
+                task = getattr(self, "lstn_task", None)
+                if task is None or task.done():
+                    self.__start({sub_id: sub})
+                    return sub_id
+                elif not self.__closing:
+                    self.__subs[sub_id] = sub
+                    # without open connection, request is sent on connection
+                    # along with the other subscriptions
+                    if self.__connected:
+                        self.__put(req)
+                    return sub_id
+            # wait for closing subscriptions to exit, out of lock as listening
+            # task needs it to stop
+            futures.wait([task])
+
+    def __start(self, subs: dict) -> None:
         # initialize internal parmeters
-        self.__filter = filter.Filter(cnf, **kw)
-        self.__id = os.urandom(16).hex()
+        self.__subs = subs
         self.__stop.clear()
-        self.__trace = deque(maxlen=self.__filter.limit)
-        # start response daemon
-        self.resp_daemon = threading.Thread(target=self.__manage_resp)
-        self.resp_daemon.setDaemon(True)
-        self.resp_daemon.start()
-        # start websocket loop daemon
-        self.lstn_daemon = threading.Thread(
-            target=self.loop.run_until_complete,
-            args=(self.loop.create_task(self.__loop()), )
+        self.__closing = False
+        self.__stopping = False
+        # run websocket task within shared loop
+        self.lstn_task = asyncio.run_coroutine_threadsafe(
+            self.__loop(), self.loop
         )
-        self.lstn_daemon.setDaemon(True)
-        self.lstn_daemon.start()
-
-    async def __send_event(self) -> None:
-        still = True
-        if not self.request.empty():
-            req = self.request.get()
-            if req[0] == "CLOSE":
-                self.__stop.set()
-                still = False
-            await asyncio.wait_for(
-                self.__ws.send(json.dumps(req)), timeout=self.timeout
-            )
-        return still
+
+    async def __send_event(self) -> bool:
+        # drain all pending requests at once, loop stops once relay answered
+        # the requests sent before the stop one (None) and requests queued
+        # after it are left for the next subscriptions
+        batch = []
+        while not self.__stopping:
+            try:
+                req = self.request.get_nowait()
+            except queue.Empty:
+                break
+            if req is None:
+                self.__stopping = True
+            else:
+                if req[0] == "EVENT":
+                    self.__pending.add(("EVENT", req[1].get("id", None)))
+                elif req[0] == "REQ":
+                    self.__pending.add(("REQ", req[1]))
+                else:
+                    # no EOSE is expected from a closed subscription
+                    self.__pending.discard(("REQ", req[1]))
+                batch.append(_dumps(req))
+        if batch:
+            await asyncio.wait_for(self.__send_batch(batch), self.timeout)
+        if self.__stopping and not self.__pending:
+            self.__stop.set()
+        return not self.__stop.is_set()
+
+    async def __send_batch(self, batch: list) -> None:
+        # sent one after the other to keep requests order
+        for req in batch:
+            await self.__ws.send(req, text=True)
 
     async def __loop(self) -> None:
         print_during_input(
@@ -183,48 +263,91 @@ Examples:
         )
         while not self.__stop.is_set():
             try:
-                async with websockets.connect(self.uri) as ws:
+                # dead connections are detected with websocket pings
+                async with websockets.connect(
+                    self.uri, ping_interval=25, ping_timeout=10,
+                    close_timeout=5
+                ) as ws:
                     # store current websocket to be used in __close_check
                     # for sendings
                     self.__ws = ws
-                    # subscribe according to self.__filter
-                    await ws.send(
-                        json.dumps(["REQ", self.__id, self.__filter.apply()])
+                    self.__pending.clear()
+                    # subscribe again to all running subscriptions, new ones
+                    # are queued from now
+                    with self.__lock:
+                        reqs = [sub[0] for sub in self.__subs.values()]
+                        self.__connected = True
+                    for req in reqs:
+                        await ws.send(req, text=True)
+                    # sending and listening run independently, sending task
+                    # ends once the CLOSE request is sent
+                    done, pending = await asyncio.wait(
+                        (
+                            asyncio.ensure_future(self.__send_loop()),
+                            asyncio.ensure_future(self.__recv_loop(ws))
+                        ),
+                        return_when=asyncio.FIRST_COMPLETED
                     )
-                    while not self.__stop.is_set():
-                        # assert is false if a CLOSE request is sent
-                        assert await(self.__send_event())
-                        self.response.put(
-                            await asyncio.wait_for(
-                                ws.recv(), timeout=self.timeout
-                            )
-                        )
-            except AssertionError:
-                continue
+                    for task in pending:
+                        task.cancel()
+                    await asyncio.gather(*pending, return_exceptions=True)
+                    for task in done:
+                        task.result()
             except websockets.ConnectionClosed:
                 continue
             except TimeoutError:
                 continue
-        # terminate self.resp_daemon
-        self.response.put("STOP")
-
-    def __manage_resp(self) -> None:
-        exit = False
-        while not exit:
-            data = self.response.get()
-            if data == "STOP":
-                exit = True
+            finally:
+                with self.__lock:
+                    self.__connected = False
+        print_during_input(
+            Style.INV + "END ".rjust(self.textwidth, " ") + Style.END
+        )
+
+    async def __send_loop(self) -> None:
+        while await self.__send_event():
+            # wait for a client request, loop stops anyway if relay does not
+            # answer within timeout
+            try:
+                await asyncio.wait_for(
+                    self.__wake.wait(),
+                    self.timeout if self.__stopping else None
+                )
+            except TimeoutError:
+                self.__pending.clear()
+            self.__wake.clear()
+
+    async def __recv_loop(self, ws) -> None:
+        while True:
+            # keep utf-8 frames undecoded, they are parsed from bytes
+            data = await ws.recv(decode=False)
+            # relay responses are displayed within the loop, an error must not
+            # stop listening
+            try:
+                data = _loads(data)
+                # only answers to client requests are awaited, subscription
+                # events and notices are not
+                if data[0] == "OK":
+                    self.__pending.discard(("EVENT", data[1]))
+                elif data[0] in ("EOSE", "CLOSED"):
+                    self.__pending.discard(("REQ", data[1]))
+                # wake up sending task if it waits for answers to stop
+                if self.__stopping:
+                    self.__wake.set()
+                self.apply(data)
+            except Exception as error:
                 print_during_input(
-                    Style.INV + "END ".rjust(self.textwidth, " ") + Style.END
+                    Style.YEL + ("response failed: %r" % error).rjust(
+                        self.textwidth, " "
+                    ) + Style.END
                 )
-            else:
-                self.apply(json.loads(data))
 
     def apply(self, data: list) -> None:
         """
 This function operates with listened data. Data is loaded from json string and
 is either `EVENT`, `NOTICE`, `OK` or `EOSE` messages as specified in
 [nostr protocol](https://github.com/nostr-protocol/nips#relay-to-client).
+Events already displayed for their subscription are skipped.
 
 Arguments:
     data (list): relay response as python object. First item of data is either
@@ -234,47 +357,76 @@ Arguments:
             evnt = data[-1]
 
             _id = evnt["id"]
-            if _id in self.__trace:
+            # events of closed subscriptions are not traced anymore
+            sub = self.__subs.get(data[1], None)
+            if sub is not None:
+                trace, traced = sub[1:]
+                if _id in traced:
+                    return
+                # keep the set of traced ids in sync with the bounded trace
+                if trace and len(trace) == trace.maxlen:
+                    traced.discard(trace[-1])
+                trace.appendleft(_id)
+                traced.add(_id)
+
+            # events without content (ie contact lists, reactions...) are
+            # not displayed
+            content = evnt.get("content", None)
+            if not content:
                 return
-            self.__trace.appendleft(_id)
-
-            prefix = " <%s>[%s](% 6d):" % (
-                evnt["pubkey"],
-                datetime.fromtimestamp(evnt["created_at"]).strftime("%X"),
-                evnt["kind"]
-            )
-            prefix = prefix.rjust(self.textwidth, "-")
-            content = textwrap.wrap(
-                evnt["content"], width=self.textwidth, break_on_hyphens=True
-            )
+            # textwidth may have been changed since last event
+            self.__wrapper.width = self.textwidth
+            content = self.__wrapper.wrap(content)
             if content:
-                print_during_input(prefix)
-                for line in content:
-                    print_during_input(Style.GRN + line + Style.END)
+                prefix = " <%s>[%s](% 6d):" % (
+                    evnt["pubkey"],
+                    time.strftime("%X", time.localtime(evnt["created_at"])),
+                    evnt["kind"]
+                )
+                print_during_input(
+                    prefix.rjust(self.textwidth, "-"),
+                    *[Style.GRN + line + Style.END for line in content]
+                )
         else:
             print_during_input(
                 Style.YEL + str(data).rjust(self.textwidth, " ") + Style.END
             )
 
-    def unsubscribe(self) -> None:
+    def unsubscribe(self, sub_id: str = None) -> None:
         """
-Stop the running subscription. Once listening daemons cleanly exited, a new
-subscription is possible. This function sends a `CLOSE` event to stop the
-thread cleanly.
+Stop a running subscription or all of them. This function sends a `CLOSE`
+event for each subscription. Once no more subscription is running, listening
+daemons cleanly exit when relay has answered the requests sent by the client
+(`OK` for events, `EOSE` or `CLOSED` for subscriptions) or after `timeout`
+seconds without answer.
 
+Arguments:
+    sub_id (str): subscription id to close, all if not given.
 Examples:
     ```python
     >>> # to close websocket, just unsubscribe
     >>> c.unsubscribe()
     ```
 """
-        self.request.put(["CLOSE", self.__id])
+        # events being signed are sent before closing
+        futures.wait(list(self.__signing))
+        with self.__lock:
+            for _id in list(self.__subs) if sub_id is None else [sub_id]:
+                if self.__subs.pop(_id, None) is not None:
+                    self.__put(["CLOSE", _id])
+            if not self.__subs and not self.__closing:
+                self.__closing = True
+                # signing worker is released, events it signs are queued
+                # before the stop request
+                if self.__signer is not None:
+                    self.__signer.shutdown(wait=True)
+                    self.__signer = None
+                self.__put(None)
 
     def send_event(self, cnf: dict = {}, **kw) -> None:
         """
 Create and send event during a subscription. See [event](event#Event) class
-for basic uses. Event is sent when a slot is available (ie timeout occured or
-`recv` completed).
+for basic uses. Event is sent as soon as the listening loop is waked up.
 
 Arguments:
     cnf (dict): key-value pairs.
@@ -296,6 +448,33 @@ Examples:
         self.push_event(evnt, prvkey)
 
     def push_event(self, evnt: event.Event, prvkey=None) -> None:
-        if "sig" not in evnt:
+        if evnt.sig is None:
+            # private key is resolved by the caller, signature is computed by
+            # a worker thread that sends the event once signed
+            prvkey = pynostr._prvkey(prvkey)
+            with self.__lock:
+                if self.__signer is None:
+                    self.__signer = futures.ThreadPoolExecutor(max_workers=1)
+                future = self.__signer.submit(self.__sign_event, evnt, prvkey)
+                self.__signing.add(future)
+            future.add_done_callback(self.__signing.discard)
+        else:
+            self.__put(["EVENT", evnt.__dict__])
+
+    def __sign_event(self, evnt: event.Event, prvkey) -> None:
+        try:
             evnt.sign(prvkey)
-        self.request.put(["EVENT", evnt.__dict__])
+        except Exception as error:
+            print_during_input(
+                Style.YEL + ("signature failed: %r" % error).rjust(
+                    self.textwidth, " "
+                ) + Style.END
+            )
+        else:
+            self.__put(["EVENT", evnt.__dict__])
+
+    def __put(self, req: list) -> None:
+        # request queue is filled from any thread, listening loop is waked up
+        # from its own thread
+        self.request.put(req)
+        self.loop.call_soon_threadsafe(self.__wake.set)
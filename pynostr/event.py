@@ -7,7 +7,6 @@ import os
 import re
 import json
 import time
-import pyaes
 import base64
 import hashlib
 import pynostr
@@ -17,13 +16,29 @@ import cSecp256k1
 
 from typing import Union, Tuple
 from enum import IntEnum
+from collections import deque
+from concurrent import futures
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import coincurve
+except ImportError:
+    coincurve = None
 
 
 HEX = re.compile("^[0-9a-f]*$")
 HEX64 = pynostr.HEX64
 HEX128 = re.compile("^[0-9a-f]{128}$")
+#: number of nonces checked by each process task when proof of work is
+#: computed with several workers.
+POW_RANGE = 2 ** 16
 EMAIL = re.compile(
-    r'([A-Za-z0-9]+[.-_])*[A-Za-z0-9]+@[A-Za-z0-9-]+(\.[A-Z|a-z]{2,})+'
+    r'[A-Za-z0-9._-]+@[A-Za-z0-9-]+(\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}',
+    re.ASCII
 )
 
 
@@ -89,11 +104,12 @@ class TagList(list):
 
     @property
     def all(self) -> dict:
+        # values are grouped in a single pass, tags are scanned on each call
+        # so that tags edited in place are always seen
         result = {}
         for tag in self:
-            tag_0 = tag[0]
-            result[tag_0] = result.get(tag_0, ()) + (tag[1:], )
-        return result
+            result.setdefault(tag[0], []).append(tag[1:])
+        return dict((key, tuple(values)) for key, values in result.items())
 
     def find(self, key: str) -> tuple:
         return tuple(tag for tag in self if tag[0] == key)
@@ -104,7 +120,7 @@ class TagList(list):
     def add_event(
         self, event_id: str, url: str = "", marker: str = None
     ) -> None:
-        if not HEX64.match(event_id):
+        if not pynostr._is_hex64(event_id):
             raise InvalidHexString(
                 "event id '%s' should be lenght-64" % event_id
             )
@@ -116,7 +132,7 @@ class TagList(list):
     def add_pubkey(
         self, pubkey: str, url: str = "", petname: str = None
     ) -> None:
-        if not HEX64.match(pubkey):
+        if not pynostr._is_hex64(pubkey):
             raise InvalidHexString(
                 "public key '%s' should be lenght-64" % pubkey
             )
@@ -126,9 +142,9 @@ class TagList(list):
         self.append(data)
 
     def reference(self, puk_or_evnt: str) -> int:
-        for tag in self:
-            if tag[1] == puk_or_evnt:
-                return self.index(tag)
+        for i, tag in enumerate(self):
+            if len(tag) > 1 and tag[1] == puk_or_evnt:
+                return i
         return -1
 
 
@@ -154,9 +170,13 @@ Attributes:
         over the event id.
 """
 
+    # internal caches are stored out of instance __dict__ so that they are
+    # never sent with the event
+    __slots__ = ("__dict__", "__weakref__", "_serial")
+
     @staticmethod
     def from_relay(data: str):
-        return Event(json.loads(data[-1]))
+        return Event(_loads(data[-1]))
 
     @staticmethod
     def set_metadata(
@@ -234,6 +254,10 @@ Arguments:
             for key in [k for k in self.__dict__ if k in params]:
                 if key == "tags":
                     value = TagList(params.get(key, []))
+                elif key == "kind" and params[key] is not None:
+                    # EventType members are stored as plain int so that
+                    # serialization does not go through IntEnum dispatch
+                    value = int(params[key])
                 else:
                     value = params.get(key, None)
                 setattr(self, key, value)
@@ -248,6 +272,15 @@ Returns:
     str: serialization of event (UTF-8 JSON-serialized string with no white
         space or line breaks).
 """
+        # serialization is computed again only if a serialized field changed,
+        # tags are compared by value as they can be modified in place
+        key = _cache_key(
+            [self.pubkey, self.created_at, self.kind, self.tags, self.content]
+        )
+        cache = getattr(self, "_serial", None)
+        if cache is not None and cache[0] == key:
+            return cache[1]
+
         missings = [
             k for k, v in self.__dict__.items()
             if v is None and k not in ["id", "sig"]
@@ -261,13 +294,23 @@ Returns:
         if any([len(t) == 0 for t in self.tags]):
             raise EmptyTagException()
 
-        return json.dumps(
+        serial = _dumps(
             [
                 0, self.pubkey, self.created_at, self.kind, self.tags,
                 self.content
-            ],
-            separators=(",", ":"), ensure_ascii=False
-        ).encode("utf-8")
+            ]
+        )
+        self._serial = (key, serial, None)
+        return serial
+
+    def _hexid(self) -> str:
+        # sha256 of serialization is cached along with it
+        serial = self.serialize()
+        key, serial, hexid = self._serial
+        if hexid is None:
+            hexid = hashlib.sha256(serial).hexdigest()
+            self._serial = (key, serial, hexid)
+        return hexid
 
     def identify(self) -> None:
         """
@@ -275,7 +318,7 @@ Compute id attribute according to [NIP-01](
     https://github.com/nostr-protocol/nips/blob/master/01.md
 ).
 """
-        self.id = hashlib.sha256(self.serialize()).hexdigest()
+        self.id = self._hexid()
 
     def verify(self) -> bool:
         """
@@ -287,19 +330,51 @@ Raises:
     IntegrityError: if id does not match with the event. This is to prevent
         issue [#59](https://github.com/fiatjaf/nostr-tools/issues/59).
 """
-        if self.id != hashlib.sha256(self.serialize()).hexdigest():
+        if self.id != self._hexid():
             raise IntegrityError()
-        if self.sig is not None:
-            if bool(
-                cSecp256k1._schnorr.verify(
-                    self.id.encode("utf-8"),
-                    self.pubkey.encode("utf-8"),
-                    self.sig[:64].encode("utf-8"),
-                    self.sig[64:].encode("utf-8")
-                )
-            ):
-                return True
-        return False
+        return self.sig is not None and self._check_sig()
+
+    @staticmethod
+    def verify_batch(events) -> bool:
+        """
+Check integrity and signature of a sequence of events. Unlike
+[`Event.verify`](#pynostr.event.Event.verify), an event that does not match its
+id makes the batch invalid instead of raising an exception.
+
+Arguments:
+    events (iterable): `Event` instances.
+Returns:
+    bool: `True` if all events are genuine, `False` other else.
+"""
+        # neither cSecp256k1 nor coincurve exposes batched schnorr
+        # verification, so cheap integrity checks are all done before any
+        # elliptic curve computation and signatures are checked one by one
+        events = list(events)
+        return all(
+            evnt.sig is not None and evnt.id == evnt._hexid()
+            for evnt in events
+        ) and all(evnt._check_sig() for evnt in events)
+
+    def _check_sig(self) -> bool:
+        # check signature against id, integrity has to be checked first
+        if coincurve is not None:
+            # libsecp256k1 BIP-340 verification over raw bytes, public keys
+            # issued by cSecp256k1 may miss their leading zeros
+            try:
+                return coincurve.PublicKeyXOnly(
+                    bytes.fromhex(self.pubkey.zfill(64))
+                ).verify(bytes.fromhex(self.sig), bytes.fromhex(self.id))
+            except ValueError:
+                return False
+        # cSecp256k1 only accepts hexadecimal inputs, signature is encoded
+        # once and split as bytes
+        sig = self.sig.encode("utf-8")
+        return bool(
+            cSecp256k1._schnorr.verify(
+                self.id.encode("utf-8"), self.pubkey.encode("utf-8"),
+                sig[:64], sig[64:]
+            )
+        )
 
     def sign(self, prvkey: Union[str, pynostr.PrvKey] = None) -> object:
         """
@@ -314,36 +389,51 @@ Returns:
         prvkey = pynostr._prvkey(prvkey)
         self.pubkey = prvkey.pubkey
         serial = self.serialize()
-        self.id = hashlib.sha256(serial).hexdigest()
-        self.sig = prvkey.sign(serial).raw().decode("utf-8")
+        self.id = self._hexid()
+        if coincurve is not None:
+            # libsecp256k1 BIP-340 signature of raw event id
+            self.sig = coincurve.PrivateKey(
+                int(prvkey).to_bytes(32, "big")
+            ).sign_schnorr(bytes.fromhex(self.id)).hex()
+        else:
+            self.sig = prvkey.sign(serial).raw().decode("utf-8")
 
         return self
 
-    def set_pow_tag(self, difficulty: int = 0) -> list:
+    def set_pow_tag(self, difficulty: int = 0, workers: int = 1) -> list:
         """
 Compute proof of work tag according to [NIP-13](
-https://github.com/nostr-protocol/nips/blob/master/13.md).
+https://github.com/nostr-protocol/nips/blob/master/13.md). Nonce search can be
+spread over several processes, the nonce found is the same whatever the number
+of workers. With `workers > 1` on platforms starting processes with `spawn`
+(Windows, macOS), the calling script must be protected by an
+`if __name__ == "__main__":` guard.
 
 Arguments:
     difficulty (int): level of difficulty to compute the nonce.
+    workers (int): number of processes used to search the nonce
+        [default = 1].
 """
         if self.pubkey:
-            # compute 256 bit mask associated to difficulty
-            mask = int("1" * difficulty, base=2) << (256 - difficulty)
-            # compute seiral with void nonce tag
-            serial = json.dumps(
-                [
-                    0, self.pubkey, self.created_at, self.kind,
-                    self.tags + [["nonce", "%s", f"{difficulty}"], ],
-                    self.content
-                ], separators=(",", ":"), ensure_ascii=False
-            )
-            # local shortcut to speed up while loop
-            enc = str.encode
-            sha256 = hashlib.sha256
-            nonce = 0
-            while int(sha256(enc(serial % nonce)).hexdigest(), base=16) & mask:
-                nonce += 1
+            # hash prefix covering difficulty bits must not exceed limit:
+            # bytes of same length compare as big endian integers
+            size = -(-difficulty // 8)
+            limit = ((1 << (8 * size - difficulty)) - 1).to_bytes(size, "big")
+            # splice nonce tag into cached serial so that only the nonce is
+            # encoded in while loop. Tag list ends just before the trailing
+            # serialized content, json and orjson escape strings the same way
+            serial = self.serialize()
+            i = len(serial) - len(
+                json.dumps(self.content, ensure_ascii=False).encode("utf-8")
+            ) - 2
+            prefix = serial[:i - 1] + (b',' if self.tags else b'') + \
+                b'["nonce","'
+            suffix = b'","%d"]]' % difficulty + serial[i:]
+            args = (prefix, suffix, limit)
+            if workers > 1:
+                nonce = _mine_parallel(*args, workers=workers)
+            else:
+                nonce = _mine(*args)
 
             self.tags.append(["nonce", "%s" % nonce, "%s" % (difficulty)])
             self.identify()
@@ -375,17 +465,16 @@ Raises:
             # specification to encrypt event.
             secret = hashlib.sha256(self.content.encode("utf-8")).digest()
             for pubkey in pubkeys:
-                aes = pyaes.AESModeOfOperationCTR(
-                    binascii.unhexlify(prvkey.shared_secret(pubkey))
-                )
                 self.tags.add_pubkey(
                     pubkey, "",
-                    base64.b64encode(aes.encrypt(secret)).decode("utf-8")
+                    base64.b64encode(
+                        pynostr._aes_ctr(secret, prvkey._shared_secret(pubkey))
+                    ).decode("utf-8")
                 )
         elif len(pubkeys) == 1:
             # NIP-04
             pubkey = pubkeys[0]
-            secret = binascii.unhexlify(prvkey.shared_secret(pubkey))
+            secret = prvkey._shared_secret(pubkey)
             if pubkey not in (t[1]for t in self.tags.p):
                 self.tags.add_pubkey(pubkey)
         else:
@@ -397,10 +486,10 @@ Raises:
         cipher = base64.b64encode(pynostr._encrypt(self.content, secret, iv))
 
         self.pubkey = prvkey.pubkey
-        self.kind = EventType.ENCRYPTED_MESSAGE
-        self.content = (
-            cipher + b"?iv=" + base64.b64encode(iv)
-        ).decode("utf-8")
+        self.kind = int(EventType.ENCRYPTED_MESSAGE)
+        self.content = b"".join(
+            (cipher, b"?iv=", base64.b64encode(iv))
+        ).decode("ascii")
         return self.content
 
     def decrypt(self, prvkey: Union[str, pynostr.PrvKey]) -> str:
@@ -429,13 +518,12 @@ Raises:
             )
         except (binascii.Error, IndexError):
             # NIP-04
-            secret = binascii.unhexlify(prvkey.shared_secret(self.pubkey))
+            secret = prvkey._shared_secret(self.pubkey)
         else:
             # NIP-48
-            aes = pyaes.AESModeOfOperationCTR(
-                binascii.unhexlify(prvkey.shared_secret(self.pubkey))
+            secret = pynostr._aes_ctr(
+                secret, prvkey._shared_secret(self.pubkey)
             )
-            secret = aes.decrypt(secret)
 
         try:
             cipher, iv = self.content.split("?iv=")
@@ -457,7 +545,98 @@ Raises:
         return decrypted.decode("utf-8")
 
     def send_to(self, url: str):
-        return asyncio.run(pynostr.send_event(self.__dict__, url))
+        async def send():
+            try:
+                return await pynostr.send_event(self.__dict__, url)
+            finally:
+                await pynostr.close_relays()
+        return asyncio.run(send())
+
+
+def _cache_key(value: object) -> tuple:
+    # every value is paired with its type as 1, 1.0 and True are equal but are
+    # not serialized the same way, lists and tuples are serialized the same
+    if isinstance(value, (list, tuple)):
+        return list, tuple(_cache_key(item) for item in value)
+    if isinstance(value, dict):
+        return dict, tuple(
+            (_cache_key(k), _cache_key(v)) for k, v in value.items()
+        )
+    return type(value), value
+
+
+def _dumps(data: list) -> bytes:
+    # compact utf-8 json serialization of NIP-01. orjson escapes strings the
+    # same way json does with ensure_ascii=False but formats floats
+    # differently, so it is used only on integer and string fields
+    if orjson is not None and type(data[1]) is type(data[5]) is str and \
+       type(data[2]) is int and isinstance(data[3], int) and \
+       all(type(value) is str for tag in data[4] for value in tag):
+        try:
+            return orjson.dumps(data)
+        except TypeError:
+            pass
+    return json.dumps(
+        data, separators=(",", ":"), ensure_ascii=False
+    ).encode("utf-8")
+
+
+def _loads(data: Union[str, bytes]) -> object:
+    # orjson parses faster but rejects some documents json accepts, such as
+    # NaN literals, so json has the final word on errors
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(data)
+
+
+def _mine(
+    prefix: bytes, suffix: bytes, limit: bytes, start: int = 0,
+    stop: int = None
+) -> int:
+    # return the first nonce giving a hash which leading bytes do not exceed
+    # limit or None if stop is reached, names are bound locally to speed up
+    # while loop. SHA-256 state over the bytes preceding the nonce is
+    # computed once and copied (hashlib keeps the incomplete last block), so
+    # only the nonce and suffix are formatted and hashed for each nonce
+    copy = hashlib.sha256(prefix).copy
+    size = len(limit)
+    nonce = start
+    while True:
+        h = copy()
+        h.update(b"%d%s" % (nonce, suffix))
+        if h.digest()[:size] <= limit:
+            break
+        nonce += 1
+        if nonce == stop:
+            return None
+    return nonce
+
+
+def _mine_parallel(
+    prefix: bytes, suffix: bytes, limit: bytes, workers: int
+) -> int:
+    # hashlib holds the GIL on small inputs so nonce ranges are searched
+    # within processes, results are read in range order so that the first
+    # valid nonce is returned
+    with futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        start = 0
+        while True:
+            while len(pending) < 2 * workers:
+                pending.append(
+                    pool.submit(
+                        _mine, prefix, suffix, limit, start, start + POW_RANGE
+                    )
+                )
+                start += POW_RANGE
+            nonce = pending.popleft().result()
+            if nonce is not None:
+                for future in pending:
+                    future.cancel()
+                return nonce
 
 
 class Metadata(Event):
@@ -478,56 +657,64 @@ Examples:
     ```
 """
 
+    # parsed content is stored out of instance __dict__ so that it is never
+    # sent with the event
+    __slots__ = ("_meta", )
+
     @property
     def name(self) -> str:
-        return json.loads(self.content).get("name", "")
+        return self._fields().get("name", "")
 
     @name.setter
     def name(self, value: str):
-        self.content = json.dumps(dict(json.loads(self.content), name=value))
+        self._update(name=value)
 
     @property
     def about(self) -> str:
-        return json.loads(self.content).get("about", "")
+        return self._fields().get("about", "")
 
     @about.setter
     def about(self, value: str):
-        self.content = json.dumps(dict(json.loads(self.content), about=value))
+        self._update(about=value)
 
     @property
     def picture(self) -> str:
-        return json.loads(self.content).get("picture", "")
+        return self._fields().get("picture", "")
 
     @picture.setter
     def picture(self, value: str):
-        self.content = json.dumps(
-            dict(json.loads(self.content), picture=value)
-        )
+        self._update(picture=value)
 
     @property
     def nip05(self) -> str:
-        return json.loads(self.content).get("nip05", None)
+        return self._fields().get("nip05", None)
 
     @nip05.setter
     def nip05(self, value: str):
-        if EMAIL.match(value):
-            self.content = json.dumps(
-                dict(json.loads(self.content), nip05=value)
-            )
+        if EMAIL.fullmatch(value):
+            self._update(nip05=value)
         else:
             raise Nip05FormatError(
                 f"{value} does not match NIP 05 specification"
             )
 
     def add_value(self, key: str, value: str):
-        self.content = json.dumps(
-            dict(json.loads(self.content), **{key: value})
-        )
+        self._update(**{key: value})
 
     def add_values(self, cnf: dict = {}, **kw):
-        self.content = json.dumps(
-            dict(json.loads(self.content), **dict(cnf, **kw))
-        )
+        self._update(**dict(cnf, **kw))
 
     def get(self, fieldname: str) -> str:
-        return json.loads(self.content).get(fieldname, None)
+        return self._fields().get(fieldname, None)
+
+    def _fields(self) -> dict:
+        # content is parsed again only if it was replaced since last parsing
+        meta = getattr(self, "_meta", None)
+        if meta is None or meta[0] is not self.content:
+            meta = self._meta = (self.content, _loads(self.content))
+        return meta[1]
+
+    def _update(self, **kw) -> None:
+        fields = dict(self._fields(), **kw)
+        self.content = json.dumps(fields)
+        self._meta = (self.content, fields)
@@ -2,22 +2,42 @@
 """
 """
 
-import re
 import time
+import pynostr
 
 
-HEX64 = re.compile("^[0-9a-f]{64}$")
+HEX64 = pynostr.HEX64
+HEX_DIGITS = b"0123456789abcdef"
+#: filter keys that are not python identifiers mapped to the attributes
+#: holding their values
+FIELD_MAP = {"#e": "_e", "#p": "_p"}
+_KEY_MAP = dict((attr, key) for key, attr in FIELD_MAP.items())
+
+
+def _hex64(values: tuple) -> list:
+    # keep values matching HEX64. The whole input is first checked at once
+    # using C level str and bytes methods, regex is run per value only if
+    # some of them are invalid
+    if set(map(len, values)) <= {64}:
+        try:
+            joined = "".join(values).encode("ascii")
+        except UnicodeEncodeError:
+            pass
+        else:
+            if not joined.translate(None, HEX_DIGITS):
+                return list(values)
+    return [value for value in values if HEX64.fullmatch(value)]
 
 
 class Filter:
 
     @property
     def events(self):
-        return self.__dict__["#e"]
+        return self._e
 
     @property
     def pubkeys(self):
-        return self.__dict__["#p"]
+        return self._p
 
     def __init__(self, cnf: dict = {}, **kw) -> None:
         self.ids = []
@@ -26,35 +46,29 @@ class Filter:
         self.since = None
         self.until = None
         self.limit = 10
-        self.__dict__["#e"] = []
-        self.__dict__["#p"] = []
+        self._e = []
+        self._p = []
 
         self.load(cnf, **kw)
 
     def load(self, cnf: dict = {}, **kw) -> None:
         params = dict(cnf, **kw)
-        if len(params):
-            for key in [k for k in self.__dict__ if k in params]:
-                value = params[key]
-                key = key.replace("_", "#")
-
-                if key == "#e":
-                    key = "events"
-                elif key == "#p":
-                    key = "pubkeys"
-                elif key.startswith("#"):
-                    self.__dict__[key] = self.__dict__.get(key, [])
-
-                if key in ["since", "until", "limit"]:
-                    setattr(self, key, value)
-                else:
-                    if isinstance(value, list):
-                        getattr(self, key).extend(value)
-                    else:
-                        getattr(self, key).append(value)
+        for key, value in params.items():
+            attr = FIELD_MAP.get(key, key)
+            if key.startswith("_") or attr not in self.__dict__:
+                continue
+
+            if attr in ["since", "until", "limit"]:
+                setattr(self, attr, value)
+            elif isinstance(value, list):
+                getattr(self, attr).extend(value)
+            else:
+                getattr(self, attr).append(value)
 
     def apply(self):
-        return dict([k, v] for k, v in self.__dict__.items() if v)
+        return dict(
+            [_KEY_MAP.get(k, k), v] for k, v in self.__dict__.items() if v
+        )
 
     def types(self, *ks):
         self.kinds.extend([k for k in ks if isinstance(k, int)])
@@ -69,15 +83,15 @@ class Filter:
         return self
 
     def published_by(self, *pubkeys):
-        self.authors.extend([puk for puk in pubkeys if HEX64.match(puk)])
+        self.authors.extend(_hex64(pubkeys))
         return self
 
     def sent_to(self, *pubkeys):
-        self.pubkeys.extend([puk for puk in pubkeys if HEX64.match(puk)])
+        self.pubkeys.extend(_hex64(pubkeys))
         return self
 
     def relative_to(self, *events):
-        self.events.extend([evnt for evnt in events if HEX64.match(evnt)])
+        self.events.extend(_hex64(events))
         return self
 
     def subcribe_to(self, *events):
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+import pynostr
+
+#: NIP-19 test vectors, note vector computed with reference bech32 encoder
+VECTORS = [
+    (
+        "npub180cvv07tjdrrgpa0j7j7tmnyl2yr6yr7l8j4s3evf6u64th6gkwsyjh6w6",
+        "3bf0c63fcb93463407af97a5e5ee64fa883d107ef9e558472c4eb9aaaefa459d"
+    ),
+    (
+        "nsec1vl029mgpspedva04g90vltkh6fvh240zqtv9k0t9af8935ke9laqsnlfe5",
+        "67dea2ed018072d675f5415ecfaed7d2597555e202d85b3d65ea4e58d2d92ffa"
+    ),
+    (
+        "note1m99r7nwc0wdrkzldrqan96gklg5usqspq7z9696j6unf0ljnpxjspqfw99",
+        "d94a3f4dd87b9a3b0bed183b32e916fa29c8020107845d1752d72697fe5309a5"
+    ),
+    # payloads that are not 32 bytes long
+    ("nrelay1qqqsyqcyq5rqwzqfpg9scrgwpugpzysn9gk3es", bytes(range(20)).hex()),
+    (
+        "nrelay1qqqsyqcyq5rqwzqfpg9scrgwpugpzysnzs23v9ccrydpk8qarc0jqckwang",
+        bytes(range(33)).hex()
+    ),
+]
+
+
+class TestBech32(unittest.TestCase):
+
+    def test_vectors(self):
+        for b32, hexa in VECTORS:
+            prefix = b32.split("1")[0]
+            self.assertEqual(pynostr.to_bech32(prefix, hexa), b32)
+            self.assertEqual(pynostr.from_bech32(b32), hexa)
+
+    def test_keys(self):
+        nsec, prvkey = VECTORS[1]
+        self.assertEqual(
+            int(pynostr.PrvKey.from_bech32(nsec)), int(prvkey, 16)
+        )
+        self.assertEqual(pynostr.bech32_prk(prvkey), nsec)
+        npub, pubkey = VECTORS[0]
+        self.assertEqual(pynostr.bech32_puk(pubkey), npub)
+
+    def test_short_payloads(self):
+        for size in range(41):
+            hexa = bytes(range(size)).hex()
+            self.assertEqual(
+                pynostr.from_bech32(pynostr.to_bech32("nrelay", hexa)), hexa
+            )
+
+    def test_invalid_checksum(self):
+        for b32, hexa in VECTORS:
+            last = "q" if b32[-1] != "q" else "p"
+            with self.assertRaises(pynostr.Bech32DecodeError):
+                pynostr.from_bech32(b32[:-1] + last)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+
+import io
+import json
+import time
+import asyncio
+import threading
+import unittest
+import websockets
+from unittest import mock
+
+import pynostr
+from pynostr import client, event
+
+
+class Recorder(client.BaseThread):
+
+    def __init__(self, *args, **kw) -> None:
+        client.BaseThread.__init__(self, *args, **kw)
+        self.received = []
+
+    def apply(self, data: list) -> None:
+        self.received.append(data)
+
+
+class TestBaseThread(unittest.TestCase):
+
+    def setUp(self):
+        # local relay running within the client shared loop
+        self.loop = client._shared_loop()
+        self.server = asyncio.run_coroutine_threadsafe(
+            self.serve(), self.loop
+        ).result(5)
+        self.addCleanup(
+            lambda: asyncio.run_coroutine_threadsafe(
+                self.close_server(), self.loop
+            ).result(5)
+        )
+        port = list(self.server.sockets)[0].getsockname()[1]
+        self.uri = "ws://127.0.0.1:%d" % port
+        self.requests = []
+        self.connections = 0
+        patch = mock.patch("sys.stdout", new_callable=io.StringIO)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    async def serve(self):
+        return await websockets.serve(self.relay, "127.0.0.1", 0)
+
+    async def close_server(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    def wait_requests(self, count: int) -> None:
+        deadline = time.time() + 5
+        while len(self.requests) < count and time.time() < deadline:
+            time.sleep(0.01)
+
+    async def relay(self, ws):
+        self.connections += 1
+        async for message in ws:
+            req = json.loads(message)
+            self.requests.append(req)
+            if req[0] == "REQ":
+                await ws.send(json.dumps(["EOSE", req[1]]))
+            elif req[0] == "EVENT":
+                # events broadcast to subscriptions before the answer
+                for i in range(3):
+                    await ws.send(json.dumps(
+                        ["EVENT", "other", dict(req[1], id="%064x" % i)]
+                    ))
+                await asyncio.sleep(0.2)
+                await ws.send(json.dumps(["OK", req[1]["id"], True, ""]))
+
+    def test_stop_waits_for_answer(self):
+        thread = Recorder(self.uri, timeout=2)
+        thread.subscribe(kinds=[1])
+        evnt = event.Event(kind=1, content="hello").sign(pynostr.PrvKey(7))
+        thread.push_event(evnt)
+        thread.unsubscribe()
+        thread.lstn_task.result(5)
+        self.assertIn(["OK", evnt.id, True, ""], thread.received)
+
+    def test_signed_events_order(self):
+        thread = Recorder(self.uri, timeout=2)
+        thread.subscribe(kinds=[1])
+        prvkey = pynostr.PrvKey(7)
+        for i in range(8):
+            thread.send_event(kind=1, content="%d" % i, prvkey=prvkey)
+        thread.unsubscribe()
+        thread.lstn_task.result(5)
+        self.assertEqual(
+            [req[1]["content"] for req in self.requests if req[0] == "EVENT"],
+            ["%d" % i for i in range(8)]
+        )
+
+    def test_multiplexed_subscriptions(self):
+        thread = Recorder(self.uri, timeout=2)
+        first = thread.subscribe(kinds=[1])
+        self.wait_requests(1)
+        second = thread.subscribe(kinds=[2])
+        self.wait_requests(2)
+        self.assertEqual(
+            [req[:2] for req in self.requests],
+            [["REQ", first], ["REQ", second]]
+        )
+        # closing one subscription keeps the other running
+        thread.unsubscribe(first)
+        self.wait_requests(3)
+        self.assertEqual(self.requests[-1], ["CLOSE", first])
+        self.assertFalse(thread.lstn_task.done())
+        thread.unsubscribe()
+        thread.lstn_task.result(5)
+        self.assertEqual(self.requests[-1], ["CLOSE", second])
+        self.assertEqual(self.connections, 1)
+        # a new subscription opens a new connection
+        third = thread.subscribe(kinds=[3])
+        self.wait_requests(5)
+        self.assertEqual(self.requests[-1][:2], ["REQ", third])
+        thread.unsubscribe()
+        thread.lstn_task.result(5)
+        self.assertEqual(self.connections, 2)
+
+    def test_concurrent_subscriptions(self):
+        thread = Recorder(self.uri, timeout=2)
+        sub_ids = []
+        run = asyncio.run_coroutine_threadsafe
+
+        def slow_start(coro, loop):
+            # widen the window between task check and task start
+            time.sleep(0.05)
+            return run(coro, loop)
+
+        patch = mock.patch.object(
+            client.asyncio, "run_coroutine_threadsafe", slow_start
+        )
+        patch.start()
+        self.addCleanup(patch.stop)
+        workers = [
+            threading.Thread(
+                target=lambda: sub_ids.append(thread.subscribe(kinds=[1]))
+            ) for i in range(8)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(2)
+        self.assertEqual(len(sub_ids), 8)
+        self.wait_requests(8)
+        thread.unsubscribe()
+        thread.lstn_task.result(5)
+        # each subscription is sent once through a single connection
+        self.assertEqual(self.connections, 1)
+        self.assertEqual(
+            sorted(req[1] for req in self.requests if req[0] == "REQ"),
+            sorted(sub_ids)
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import pynostr
+from pynostr import Contact
+
+ALICE = Contact("aa" * 32, "wss://relay.one", "alice")
+BOB = Contact("bb" * 32, "", "bob")
+CAROL = Contact("npub1carol", "wss://relay.two", "carol")
+
+
+class TestContactStorage(unittest.TestCase):
+
+    def setUp(self):
+        # contact files are written in a temporary folder
+        self.folder = tempfile.mkdtemp()
+        for patch in [
+            mock.patch.object(pynostr, "_CONTACT_DIR", self.folder),
+            mock.patch.object(pynostr, "_PRVKEY_DIR", self.folder),
+            mock.patch.object(pynostr, "_DIRS_READY", False),
+            mock.patch.dict(pynostr._CONTACTS, clear=True),
+        ]:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.addCleanup(shutil.rmtree, self.folder, ignore_errors=True)
+
+    def read(self, name: str) -> bytes:
+        with open(os.path.join(self.folder, name), "rb") as _in:
+            return _in.read()
+
+    def test_missing_file(self):
+        self.assertEqual(pynostr.load_contact("nobody"), [])
+
+    def test_round_trip(self):
+        pynostr.dump_contact("friends", BOB, ALICE, CAROL)
+        self.assertEqual(pynostr.load_contact("friends"), [ALICE, BOB, CAROL])
+
+    def test_override_by_pubkey(self):
+        pynostr.dump_contact("friends", ALICE, BOB)
+        renamed = Contact(ALICE.pubkey, "wss://relay.new", "zoe")
+        pynostr.dump_contact("friends", renamed)
+        self.assertEqual(pynostr.load_contact("friends"), [BOB, renamed])
+        # file is read again by a fresh process
+        pynostr._CONTACTS.clear()
+        self.assertEqual(pynostr.load_contact("friends"), [BOB, renamed])
+
+    def test_json_migration(self):
+        # contact file written with former json format
+        with open(os.path.join(self.folder, "friends"), "w") as out:
+            out.write(json.dumps([list(ALICE), list(CAROL)], indent=2))
+        self.assertEqual(pynostr.load_contact("friends"), [ALICE, CAROL])
+
+        pynostr.dump_contact("friends", BOB)
+        self.assertNotEqual(self.read("friends")[:1], b"[")
+        self.assertEqual(pynostr.load_contact("friends"), [ALICE, BOB, CAROL])
+        pynostr._CONTACTS.clear()
+        self.assertEqual(pynostr.load_contact("friends"), [ALICE, BOB, CAROL])
+
+    def test_log_compaction(self):
+        for i in range(100):
+            pynostr.dump_contact(
+                "friends", ALICE, Contact(BOB.pubkey, "", "bob%02d" % i)
+            )
+        expected = [ALICE, Contact(BOB.pubkey, "", "bob99")]
+        self.assertEqual(pynostr.load_contact("friends"), expected)
+        # overridden records are dropped once they outnumber live ones
+        self.assertLess(len(self.read("friends")), 100 * 2 * 32)
+        pynostr._CONTACTS.clear()
+        self.assertEqual(pynostr.load_contact("friends"), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+import unittest
+import cSecp256k1
+from unittest import mock
+
+import pynostr
+from pynostr import event
+
+#: private keys 17 and 7 share a secret which x abscissa starts with a zero
+#: nibble, cSecp256k1 gives it as an odd-length hexadecimal string.
+ODD_SHARED = (17, 7)
+#: private key 7 file content for pin "1234", produced by pyaes CTR mode with
+#: its default counter starting at 1.
+PYAES_DUMP = (
+    b"2VBvK+b+q0ctUAO6WM2SARUE6yuIvJn5XY8diXzY7l40SuYl3WAnDTMJG7Qg2DHU6BT51qen"
+    b"ILpvIozIA8y8hw=="
+)
+PYAES_FILE = \
+    "03ac674216f3e15c761ee1a5e255f067953623c8b388b4459e13f978d7c846f4.key"
+
+
+class TestNip04(unittest.TestCase):
+
+    def setUp(self):
+        self.pairs = [
+            tuple(pynostr.PrvKey(i) for i in ODD_SHARED),
+            (pynostr.PrvKey(3), pynostr.PrvKey(5)),
+        ]
+
+    def test_shared_secret(self):
+        for k1, k2 in self.pairs:
+            secret = k1.shared_secret(k2.pubkey)
+            self.assertEqual(len(secret), 64)
+            self.assertEqual(secret, k2.shared_secret(k1.pubkey))
+            self.assertEqual(secret, k2.shared_secret(k1.npub))
+
+    def test_cached_secret(self):
+        for k1, k2 in self.pairs:
+            cached = k1.shared_secret(k2.pubkey)
+            self.assertIn(
+                (k1.pubkey, "02" + k2.pubkey), pynostr._SHARED_SECRETS
+            )
+            # fresh ECDH computation gives the cached secret
+            with mock.patch.dict(pynostr._SHARED_SECRETS, clear=True):
+                self.assertEqual(k1.shared_secret(k2.pubkey), cached)
+            point = cSecp256k1.PublicKey.decode("02" + k2.pubkey) * int(k1)
+            self.assertEqual(int(point.x, 16), int(cached, 16))
+        # private scalars are not kept in cache
+        self.assertFalse(any(
+            int(k) in key for pair in self.pairs for k in pair
+            for key in pynostr._SHARED_SECRETS
+        ))
+
+    def test_round_trip(self):
+        for k1, k2 in self.pairs:
+            for msg in ["simple message", "unicode é ✓", "", "x" * 16]:
+                cipher = k1.encrypt(msg, k2.pubkey)
+                self.assertEqual(k2.decrypt(cipher, k1.pubkey), msg)
+
+    def test_event_round_trip(self):
+        for k1, k2 in self.pairs:
+            evnt = event.Event(content="secret note")
+            evnt.encrypt(k1, k2.pubkey)
+            self.assertEqual(evnt.kind, event.EventType.ENCRYPTED_MESSAGE)
+            self.assertNotEqual(evnt.content, "secret note")
+            self.assertEqual(evnt.decrypt(k2), "secret note")
+
+
+class TestNip48(unittest.TestCase):
+
+    def test_event_round_trip(self):
+        issuer = pynostr.PrvKey(ODD_SHARED[0])
+        receivers = [pynostr.PrvKey(i) for i in (ODD_SHARED[1], 5, 11)]
+        evnt = event.Event(content="group note")
+        evnt.encrypt(issuer, *[k.pubkey for k in receivers])
+        self.assertEqual(len(evnt.tags.p), len(receivers))
+        for prvkey in receivers:
+            self.assertEqual(evnt.decrypt(prvkey), "group note")
+
+    def test_unknown_receiver(self):
+        evnt = event.Event(content="group note")
+        evnt.encrypt(pynostr.PrvKey(3), pynostr.PrvKey(5).pubkey)
+        with self.assertRaises(event.EmptyTagException):
+            evnt.decrypt(pynostr.PrvKey(11))
+
+
+class TestPrvKeyStorage(unittest.TestCase):
+
+    def setUp(self):
+        # private key files are written in a temporary folder
+        self.folder = tempfile.mkdtemp()
+        for patch in [
+            mock.patch.object(pynostr, "_CONTACT_DIR", self.folder),
+            mock.patch.object(pynostr, "_PRVKEY_DIR", self.folder),
+            mock.patch.object(pynostr, "_DIRS_READY", False),
+        ]:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.addCleanup(shutil.rmtree, self.folder, ignore_errors=True)
+
+    def test_round_trip(self):
+        for prvkey in [pynostr.PrvKey(7), pynostr.PrvKey(2 ** 255 + 19)]:
+            prvkey.dump("1234")
+            self.assertEqual(int(pynostr.PrvKey.load("1234")), int(prvkey))
+        self.assertIsNone(pynostr.PrvKey.load("0000"))
+
+    def test_pyaes_compatibility(self):
+        pynostr.PrvKey(7).dump("1234")
+        with open(os.path.join(self.folder, PYAES_FILE), "rb") as _in:
+            self.assertEqual(_in.read(), PYAES_DUMP)
+        # files written by former versions are still readable
+        with open(os.path.join(self.folder, PYAES_FILE), "wb") as out:
+            out.write(PYAES_DUMP)
+        self.assertEqual(int(pynostr.PrvKey.load("1234")), 7)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+
+import json
+import unittest
+from unittest import mock
+
+import pynostr
+from pynostr import event
+
+#: private key whose public key abscissa starts with a zero byte, cSecp256k1
+#: gives it as a 62 characters hexadecimal string.
+ZERO_PREFIXED = 153
+
+
+class TestSignature(unittest.TestCase):
+
+    def setUp(self):
+        self.keys = [pynostr.PrvKey(ZERO_PREFIXED), pynostr.PrvKey(7)]
+
+    def test_pubkey_is_padded(self):
+        pubkey = pynostr.PrvKey(ZERO_PREFIXED).pubkey
+        self.assertEqual(len(pubkey), 64)
+        self.assertTrue(pubkey.startswith("00"))
+
+    def test_sign_verify(self):
+        for prvkey in self.keys:
+            evnt = event.Event(kind=1, content="hello").sign(prvkey)
+            self.assertEqual(evnt.pubkey, prvkey.pubkey)
+            self.assertTrue(evnt.verify())
+            # cSecp256k1 backend checks the same signature
+            with mock.patch.object(event, "coincurve", None):
+                self.assertTrue(evnt.verify())
+
+    def test_verify_batch(self):
+        events = [
+            event.Event(kind=1, content="%d" % i).sign(prvkey)
+            for i, prvkey in enumerate(self.keys)
+        ]
+        self.assertTrue(event.Event.verify_batch(events))
+        events[0].sig = events[1].sig
+        self.assertFalse(event.Event.verify_batch(events))
+
+    def test_serial_follows_number_types(self):
+        evnt = event.Event(kind=1, content="", pubkey="ab" * 32, created_at=1)
+        evnt.identify()
+        ident = evnt.id
+        evnt.created_at = 1.0
+        self.assertIn(b",1.0,", evnt.serialize())
+        evnt.identify()
+        self.assertNotEqual(evnt.id, ident)
+        evnt.created_at = 1
+        evnt.identify()
+        self.assertEqual(evnt.id, ident)
+
+    def test_serial_follows_tag_types(self):
+        evnt = event.Event(
+            kind=1, content="", pubkey="ab" * 32, created_at=1,
+            tags=[["x", 1]]
+        )
+        self.assertIn(b'["x",1]', evnt.serialize())
+        evnt.tags[0][1] = True
+        self.assertIn(b'["x",true]', evnt.serialize())
+        evnt.tags[0][1] = 1.0
+        self.assertIn(b'["x",1.0]', evnt.serialize())
+
+    def test_tampered_event(self):
+        evnt = event.Event(kind=1, content="hello").sign(self.keys[0])
+        evnt.content = "hello!"
+        with self.assertRaises(event.IntegrityError):
+            evnt.verify()
+
+
+class TestProofOfWork(unittest.TestCase):
+
+    def setUp(self):
+        self.events = [
+            event.Event(
+                kind=1, content=content, pubkey="ab" * 32,
+                created_at=1700000000, tags=tags
+            ) for content, tags in [
+                ("hello", []),
+                ('quote " and unicode é ✓', [["t", "nostr"], ["p", "cd" * 32]])
+            ]
+        ]
+
+    def leading_zeros(self, evnt: event.Event) -> int:
+        return 256 - int(evnt.id, 16).bit_length()
+
+    def test_difficulty(self):
+        for evnt in self.events:
+            for difficulty in [0, 1, 8, 12]:
+                evnt.tags[:] = [t for t in evnt.tags if t[0] != "nonce"]
+                evnt.set_pow_tag(difficulty)
+                self.assertGreaterEqual(self.leading_zeros(evnt), difficulty)
+                self.assertEqual(evnt.tags[-1][0], "nonce")
+                self.assertEqual(evnt.tags[-1][2], "%d" % difficulty)
+
+    def test_serialization(self):
+        for evnt in self.events:
+            evnt.set_pow_tag(10)
+            self.assertEqual(
+                evnt.serialize(),
+                json.dumps(
+                    [0, evnt.pubkey, evnt.created_at, evnt.kind, evnt.tags,
+                     evnt.content], separators=(",", ":"), ensure_ascii=False
+                ).encode("utf-8")
+            )
+
+    def test_workers(self):
+        for evnt in self.events:
+            tags = list(evnt.tags)
+            evnt.set_pow_tag(10, workers=2)
+            self.assertGreaterEqual(self.leading_zeros(evnt), 10)
+            nonce = evnt.tags[-1]
+            evnt.tags[:] = tags
+            evnt.set_pow_tag(10)
+            self.assertEqual(evnt.tags[-1], nonce)
+
+    def test_orphan_event(self):
+        with self.assertRaises(event.OrphanEvent):
+            event.Event(kind=1, content="").set_pow_tag(1)
+
+
+class TestMetadata(unittest.TestCase):
+
+    def setUp(self):
+        self.meta = event.Metadata(kind=0, content="{}")
+
+    def test_nip05_accepted(self):
+        for value in [
+            "bob@example.com", "bob@nostr.my-relay.com", "bob@sub.example2.io",
+            "_@example.com", "bob.smith-jr_2@example.com"
+        ]:
+            self.meta.nip05 = value
+            self.assertEqual(self.meta.nip05, value)
+
+    def test_nip05_rejected(self):
+        for value in [
+            "bob", "bob@", "@example.com", "bob@example", "bob@example.c",
+            "bob@example.com2", "bob smith@example.com", "bob@exa mple.com",
+            "bob@example..com", "bob@example|com"
+        ]:
+            with self.assertRaises(event.Nip05FormatError):
+                self.meta.nip05 = value
+        self.assertIsNone(self.meta.nip05)
+
+
+if __name__ == "__main__":
+    unittest.main()
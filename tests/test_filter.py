@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from pynostr import filter
+
+EVENT_ID = "cd" * 32
+PUBKEY = "ab" * 32
+
+
+class TestFilter(unittest.TestCase):
+
+    def test_tag_keys(self):
+        fltr = filter.Filter({"#e": [EVENT_ID]}, **{"#p": PUBKEY})
+        self.assertEqual(fltr._e, [EVENT_ID])
+        self.assertEqual(fltr.events, [EVENT_ID])
+        self.assertEqual(fltr._p, [PUBKEY])
+        self.assertEqual(fltr.pubkeys, [PUBKEY])
+        self.assertEqual(
+            fltr.apply(), {"#e": [EVENT_ID], "#p": [PUBKEY], "limit": 10}
+        )
+
+    def test_private_and_unknown_keys(self):
+        fltr = filter.Filter(_e=[EVENT_ID], _p=PUBKEY, unknown=1)
+        self.assertEqual(fltr._e, [])
+        self.assertEqual(fltr._p, [])
+        self.assertEqual(fltr.apply(), {"limit": 10})
+
+    def test_builders(self):
+        fltr = filter.Filter(kinds=1, limit=5)
+        fltr.relative_to(EVENT_ID).sent_to(PUBKEY).published_by(PUBKEY)
+        self.assertEqual(
+            fltr.apply(), {
+                "authors": [PUBKEY], "kinds": [1], "limit": 5,
+                "#e": [EVENT_ID], "#p": [PUBKEY]
+            }
+        )
+
+    def test_hex64(self):
+        self.assertEqual(
+            filter._hex64((EVENT_ID, PUBKEY)), [EVENT_ID, PUBKEY]
+        )
+        for invalid in [
+            "CD" * 32, "cd" * 31, "cd" * 33, "g" * 64, "é" * 64,
+            "cd" * 31 + "c\n", ""
+        ]:
+            # bulk check fails and values are checked one by one
+            self.assertEqual(
+                filter._hex64((EVENT_ID, invalid, PUBKEY)),
+                [EVENT_ID, PUBKEY]
+            )
+            self.assertEqual(filter._hex64((invalid,)), [])
+        fltr = filter.Filter().published_by(PUBKEY, "ab" * 31 + "zz")
+        self.assertEqual(fltr.authors, [PUBKEY])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+
+import json
+import asyncio
+import threading
+import unittest
+import websockets
+
+import pynostr
+
+
+class TestRelayPool(unittest.TestCase):
+
+    def setUp(self):
+        # local relay running in its own loop
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+        self.server = self.run_in(self.serve())
+        port = list(self.server.sockets)[0].getsockname()[1]
+        self.uri = "ws://127.0.0.1:%d" % port
+        self.addCleanup(self.loop.call_soon_threadsafe, self.loop.stop)
+        self.addCleanup(self.run_in, self.close_server())
+
+    def run_in(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(5)
+
+    async def serve(self):
+        return await websockets.serve(self.relay, "127.0.0.1", 0)
+
+    async def close_server(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def relay(self, ws):
+        async for message in ws:
+            req = json.loads(message)
+            await ws.send(json.dumps(["OK", req[1]["id"], True, ""]))
+
+    def test_one_connection_per_loop(self):
+        self.assertEqual(
+            self.run_in(pynostr.send_event({"id": "1"}, self.uri)),
+            ["OK", "1", True, ""]
+        )
+        key = (self.loop, self.uri)
+        websocket = pynostr._RELAY_POOL[key][0]
+        # another loop opens its own connection, closed when loop exits
+        self.assertEqual(
+            asyncio.run(pynostr.send_event({"id": "2"}, self.uri)),
+            ["OK", "2", True, ""]
+        )
+        self.assertEqual(list(pynostr._RELAY_POOL), [key])
+        self.assertIs(pynostr._RELAY_POOL[key][0], websocket)
+        self.assertEqual(
+            self.run_in(pynostr.send_event({"id": "3"}, self.uri)),
+            ["OK", "3", True, ""]
+        )
+        self.assertIs(pynostr._RELAY_POOL[key][0], websocket)
+        self.run_in(pynostr.close_relays())
+        self.assertEqual(pynostr._RELAY_POOL, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
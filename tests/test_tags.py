@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+import json
+import unittest
+
+from pynostr import event
+
+PUBKEY = "ab" * 32
+EVENT_ID = "cd" * 32
+
+
+class TestTagList(unittest.TestCase):
+
+    def setUp(self):
+        self.tags = event.TagList([["p", PUBKEY, ""], ["t", "nostr"]])
+
+    def test_find_follows_mutations(self):
+        self.assertEqual(self.tags.p, (["p", PUBKEY, ""],))
+        self.tags.add_event(EVENT_ID)
+        self.assertEqual(self.tags.e, (["e", EVENT_ID, ""],))
+        self.tags[1] = ["e", "ef" * 32]
+        self.assertEqual(len(self.tags.e), 2)
+        self.assertEqual(self.tags.find("t"), ())
+        # tags edited in place are seen
+        self.tags[0][0] = "t"
+        self.assertEqual(self.tags.p, ())
+        self.assertEqual(self.tags.find("t"), (["t", PUBKEY, ""],))
+        self.tags[:] = [["p", PUBKEY]]
+        self.assertEqual(self.tags.all, {"p": ([PUBKEY],)})
+
+    def test_all(self):
+        self.tags.add_tag("t", "python")
+        self.assertEqual(
+            self.tags.all,
+            {"p": ([PUBKEY, ""],), "t": (["nostr"], ["python"])}
+        )
+
+    def test_reference_follows_mutations(self):
+        self.assertEqual(self.tags.reference(PUBKEY), 0)
+        self.assertEqual(self.tags.reference("nostr"), 1)
+        self.assertEqual(self.tags.reference(EVENT_ID), -1)
+        self.tags[1][1] = EVENT_ID
+        self.assertEqual(self.tags.reference(EVENT_ID), 1)
+        self.assertEqual(self.tags.reference("nostr"), -1)
+        self.tags.insert(0, ["p", PUBKEY, "wss://relay"])
+        # first matching tag is returned
+        self.assertEqual(self.tags.reference(PUBKEY), 0)
+        self.tags.remove(["p", PUBKEY, "wss://relay"])
+        self.assertEqual(self.tags.reference(EVENT_ID), 1)
+        # tags without value are skipped
+        self.tags.insert(0, ["t"])
+        self.assertEqual(self.tags.reference(PUBKEY), 1)
+
+    def test_serialization(self):
+        evnt = event.Event(
+            kind=1, content="", pubkey=PUBKEY, created_at=1700000000,
+            tags=[["p", PUBKEY, ""]]
+        )
+        self.assertIsInstance(evnt.tags, event.TagList)
+        serial = evnt.serialize()
+        self.assertEqual(
+            json.loads(serial),
+            [0, PUBKEY, 1700000000, 1, [["p", PUBKEY, ""]], ""]
+        )
+        evnt.tags.add_tag("t", "nostr")
+        self.assertNotEqual(evnt.serialize(), serial)
+        serial = evnt.serialize()
+        evnt.tags[1][1] = "python"
+        self.assertNotEqual(evnt.serialize(), serial)
+
+
+if __name__ == "__main__":
+    unittest.main()